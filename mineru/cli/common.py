@@ -9,7 +9,7 @@ import pypdfium2 as pdfium
 from loguru import logger
 
 from mineru.data.data_reader_writer import FileBasedDataWriter
-from mineru.utils.draw_bbox import draw_layout_bbox, draw_span_bbox
+from mineru.utils.draw_bbox import draw_layout_bbox, draw_span_bbox, prepare_pdf
 from mineru.utils.enum_class import MakeMode
 from mineru.utils.pdf_image_tools import images_bytes_to_pdf_bytes
 from mineru.backend.vlm.vlm_middle_json_mkcontent import union_make as vlm_union_make
@@ -105,11 +105,21 @@ def _process_output(
 ):
     from mineru.backend.pipeline.pipeline_middle_json_mkcontent import union_make as pipeline_union_make
     """处理输出文件"""
+    pdf_reader, page_meta = None, None
+    if f_draw_layout_bbox or f_draw_span_bbox:
+        # 两个可视化函数共用同一次PDF解析结果；解析失败时交由各函数自行解析和处理错误
+        try:
+            pdf_reader, page_meta = prepare_pdf(pdf_bytes)
+        except Exception as e:
+            logger.warning(f"Could not parse PDF for bbox drawing: {e}")
+
     if f_draw_layout_bbox:
-        draw_layout_bbox(pdf_info, pdf_bytes, local_md_dir, f"{pdf_file_name}_layout.pdf", raw_images=raw_images)
+        draw_layout_bbox(pdf_info, pdf_bytes, local_md_dir, f"{pdf_file_name}_layout.pdf", raw_images=raw_images,
+                         pdf_reader=pdf_reader, page_meta=page_meta)
 
     if f_draw_span_bbox:
-        draw_span_bbox(pdf_info, pdf_bytes, local_md_dir, f"{pdf_file_name}_span.pdf", raw_images=raw_images)
+        draw_span_bbox(pdf_info, pdf_bytes, local_md_dir, f"{pdf_file_name}_span.pdf", raw_images=raw_images,
+                       pdf_reader=pdf_reader, page_meta=page_meta)
 
     if f_dump_orig_pdf:
         md_writer.write(
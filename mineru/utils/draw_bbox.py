@@ -1,100 +1,139 @@
 import json
 import os
+from collections import defaultdict
 from io import BytesIO
 
+import numpy as np
+import pypdfium2 as pdfium
 from loguru import logger
 from PIL import Image
-from pypdf import PdfReader, PdfWriter, PageObject
+from pypdf import PdfReader, PdfWriter
 from reportlab.pdfgen import canvas
 
 from .enum_class import BlockType, ContentType
 
 
-def cal_canvas_rect(page, bbox):
+def _read_page_meta(page):
+    """读取页面宽高和旋转角度，每页只读一次，避免在 bbox 循环里反复访问 pypdf 对象"""
+    page_width, page_height = float(page.cropbox[2]), float(page.cropbox[3])
+    rotation = page.get("/Rotate", 0) % 360
+    return page_width, page_height, rotation
+
+
+# 每种旋转角度下 bbox -> canvas rect 的仿射变换：rect = bbox @ linear.T + offset @ (page_width, page_height)
+# bbox 为 [x0, y0, x1, y1]，rect 为 [x, y, width, height]
+_RECT_AFFINE = {
+    0: (
+        np.array([[1, 0, 0, 0], [0, 0, 0, -1], [-1, 0, 1, 0], [0, -1, 0, 1]], dtype=np.float64),
+        np.array([[0, 0], [0, 1], [0, 0], [0, 0]], dtype=np.float64),
+    ),
+    90: (
+        np.array([[0, 1, 0, 0], [1, 0, 0, 0], [0, -1, 0, 1], [-1, 0, 1, 0]], dtype=np.float64),
+        np.zeros((4, 2), dtype=np.float64),
+    ),
+    180: (
+        np.array([[0, 0, -1, 0], [0, 1, 0, 0], [-1, 0, 1, 0], [0, -1, 0, 1]], dtype=np.float64),
+        np.array([[1, 0], [0, 0], [0, 0], [0, 0]], dtype=np.float64),
+    ),
+    270: (
+        np.array([[0, 0, 0, -1], [0, 0, -1, 0], [0, -1, 0, 1], [-1, 0, 1, 0]], dtype=np.float64),
+        np.array([[1, 0], [0, 1], [0, 0], [0, 0]], dtype=np.float64),
+    ),
+}
+
+
+def cal_canvas_rect_batch(page_width, page_height, rotation, bboxes):
+    """
+    Calculate the canvas rectangles of all bboxes of one page based on the original PDF page.
+
+    Args:
+        page_width: Width of the PDF page (cropbox).
+        page_height: Height of the PDF page (cropbox).
+        rotation: Rotation of the PDF page in degrees (the page's /Rotate value).
+        bboxes: (N, 4) array-like of [x0, y0, x1, y1].
+
+    Returns:
+        rects: (N, 4) float64 array of [x0, y0, width, height] on the canvas.
+    """
+    boxes = np.ascontiguousarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    linear, offset = _RECT_AFFINE.get(rotation % 360, _RECT_AFFINE[0])
+
+    rects = boxes @ linear.T + offset @ np.array([page_width, page_height], dtype=np.float64)
+    rects[:, 2:] = np.abs(rects[:, 2:])
+    return rects
+
+
+def cal_canvas_rect(page_width, page_height, rotation, bbox):
     """
     Calculate the rectangle coordinates on the canvas based on the original PDF page and bounding box.
 
     Args:
-        page: A PyPDF2 Page object representing a single page in the PDF.
+        page_width: Width of the PDF page (cropbox).
+        page_height: Height of the PDF page (cropbox).
+        rotation: Rotation of the PDF page in degrees (the page's /Rotate value).
         bbox: [x0, y0, x1, y1] representing the bounding box coordinates.
 
     Returns:
         rect: [x0, y0, width, height] representing the rectangle coordinates on the canvas.
     """
-    page_width, page_height = float(page.cropbox[2]), float(page.cropbox[3])
-    
-    actual_width = page_width    # The width of the final PDF display
-    actual_height = page_height  # The height of the final PDF display
-    
-    rotation = page.get("/Rotate", 0)
-    rotation = rotation % 360
-    
-    if rotation in [90, 270]:
-        # PDF is rotated 90 degrees or 270 degrees, and the width and height need to be swapped
-        actual_width, actual_height = actual_height, actual_width
-        
-    x0, y0, x1, y1 = bbox
-    rect_w = abs(x1 - x0)
-    rect_h = abs(y1 - y0)
-    
-    if 270 == rotation:
-        rect_w, rect_h = rect_h, rect_w
-        x0 = actual_height - y1
-        y0 = actual_width - x1
-    elif 180 == rotation:
-        x0 = page_width - x1
-        y0 = y0
-    elif 90 == rotation:
-        rect_w, rect_h = rect_h, rect_w
-        x0, y0 = y0, x0 
-    else:
-        # 0 == rotation:
-        x0 = x0
-        y0 = page_height - y1
-    
-    rect = [x0, y0, rect_w, rect_h]        
-    return rect
+    return cal_canvas_rect_batch(page_width, page_height, rotation, [bbox])[0].tolist()
 
 
-def draw_bbox_without_number(i, bbox_list, page, c, rgb_config, fill_config):
-    new_rgb = [float(color) / 255 for color in rgb_config]
-    page_data = bbox_list[i]
+def draw_bbox_groups_without_number(page_groups, page_meta, c):
+    """
+    Draw several bbox layers of one page in a single pass.
 
-    for bbox in page_data:
-        rect = cal_canvas_rect(page, bbox)  # Define the rectangle  
+    Args:
+        page_groups: List of (page_data, rgb, fill_config); page_data holds the bboxes of this page,
+            rgb is a color from COLORS with components in [0, 1].
+        page_meta: (page_width, page_height, rotation) of the page.
+        c: The reportlab canvas of the page overlay.
 
+    Returns:
+        c: The same canvas.
+    """
+    page_width, page_height, rotation = page_meta
+    # 所有图层的 bbox 合并后只做一次坐标变换
+    all_bboxes = [bbox for page_data, _, _ in page_groups for bbox in page_data]
+    if not all_bboxes:
+        return c
+    rects = cal_canvas_rect_batch(page_width, page_height, rotation, all_bboxes).tolist()
+
+    start = 0
+    for page_data, rgb, fill_config in page_groups:
+        if not page_data:
+            continue
+        group_rects = rects[start:start + len(page_data)]
+        start += len(page_data)
+
+        # 同一图层只设置一次颜色
         if fill_config:  # filled rectangle
-            c.setFillColorRGB(new_rgb[0], new_rgb[1], new_rgb[2], 0.3)
-            c.rect(rect[0], rect[1], rect[2], rect[3], stroke=0, fill=1)
+            c.setFillColorRGB(*rgb, 0.3)
+            for rect in group_rects:
+                c.rect(rect[0], rect[1], rect[2], rect[3], stroke=0, fill=1)
         else:  # bounding box
-            c.setStrokeColorRGB(new_rgb[0], new_rgb[1], new_rgb[2])
-            c.rect(rect[0], rect[1], rect[2], rect[3], stroke=1, fill=0)
+            c.setStrokeColorRGB(*rgb)
+            for rect in group_rects:
+                c.rect(rect[0], rect[1], rect[2], rect[3], stroke=1, fill=0)
     return c
 
 
-def draw_bbox_with_number(i, bbox_list, page, c, rgb_config, fill_config, draw_bbox=True):
-    new_rgb = [float(color) / 255 for color in rgb_config]
-    page_data = bbox_list[i]
-    # 强制转换为 float
-    page_width, page_height = float(page.cropbox[2]), float(page.cropbox[3])
+def draw_bbox_with_number(page_data, page_meta, c, rgb, fill_config, draw_bbox=True):
+    page_width, page_height, rotation = page_meta
+    rects = cal_canvas_rect_batch(page_width, page_height, rotation, page_data).tolist()
 
-    for j, bbox in enumerate(page_data):
-        # 确保bbox的每个元素都是float
-        rect = cal_canvas_rect(page, bbox)  # Define the rectangle  
-        
+    for j, rect in enumerate(rects):
         if draw_bbox:
             if fill_config:
-                c.setFillColorRGB(*new_rgb, 0.3)
+                c.setFillColorRGB(*rgb, 0.3)
                 c.rect(rect[0], rect[1], rect[2], rect[3], stroke=0, fill=1)
             else:
-                c.setStrokeColorRGB(*new_rgb)
+                c.setStrokeColorRGB(*rgb)
                 c.rect(rect[0], rect[1], rect[2], rect[3], stroke=1, fill=0)
-        c.setFillColorRGB(*new_rgb, 1.0)
+        c.setFillColorRGB(*rgb, 1.0)
         c.setFontSize(size=10)
         
         c.saveState()
-        rotation = page.get("/Rotate", 0)
-        rotation = rotation % 360
     
         if 0 == rotation:
             c.translate(rect[0] + rect[2] + 2, rect[1] + rect[3] - 10)
@@ -112,163 +151,227 @@ def draw_bbox_with_number(i, bbox_list, page, c, rgb_config, fill_config, draw_b
     return c
 
 
-def draw_layout_bbox(pdf_info, pdf_bytes, out_path, filename, raw_images=None):
-    dropped_bbox_list = []
-    tables_list, tables_body_list = [], []
-    tables_caption_list, tables_footnote_list = [], []
-    imgs_list, imgs_body_list, imgs_caption_list = [], [], []
-    imgs_footnote_list = []
-    titles_list = []
-    texts_list = []
-    interequations_list = []
-    lists_list = []
-    indexs_list = []
-    for page in pdf_info:
-        page_dropped_list = []
-        tables, tables_body, tables_caption, tables_footnote = [], [], [], []
-        imgs, imgs_body, imgs_caption, imgs_footnote = [], [], [], []
-        titles = []
-        texts = []
-        interequations = []
-        lists = []
-        indices = []
-
-        for dropped_bbox in page['discarded_blocks']:
-            page_dropped_list.append(dropped_bbox['bbox'])
-        dropped_bbox_list.append(page_dropped_list)
-        for block in page["para_blocks"]:
-            bbox = block["bbox"]
-            if block["type"] == BlockType.TABLE:
-                tables.append(bbox)
-                for nested_block in block["blocks"]:
-                    bbox = nested_block["bbox"]
-                    if nested_block["type"] == BlockType.TABLE_BODY:
-                        tables_body.append(bbox)
-                    elif nested_block["type"] == BlockType.TABLE_CAPTION:
-                        tables_caption.append(bbox)
-                    elif nested_block["type"] == BlockType.TABLE_FOOTNOTE:
-                        tables_footnote.append(bbox)
-            elif block["type"] == BlockType.IMAGE:
-                imgs.append(bbox)
-                for nested_block in block["blocks"]:
-                    bbox = nested_block["bbox"]
-                    if nested_block["type"] == BlockType.IMAGE_BODY:
-                        imgs_body.append(bbox)
-                    elif nested_block["type"] == BlockType.IMAGE_CAPTION:
-                        imgs_caption.append(bbox)
-                    elif nested_block["type"] == BlockType.IMAGE_FOOTNOTE:
-                        imgs_footnote.append(bbox)
-            elif block["type"] == BlockType.TITLE:
-                titles.append(bbox)
-            elif block["type"] == BlockType.TEXT:
-                texts.append(bbox)
-            elif block["type"] == BlockType.INTERLINE_EQUATION:
-                interequations.append(bbox)
-            elif block["type"] == BlockType.LIST:
-                lists.append(bbox)
-            elif block["type"] == BlockType.INDEX:
-                indices.append(bbox)
-
-        tables_list.append(tables)
-        tables_body_list.append(tables_body)
-        tables_caption_list.append(tables_caption)
-        tables_footnote_list.append(tables_footnote)
-        imgs_list.append(imgs)
-        imgs_body_list.append(imgs_body)
-        imgs_caption_list.append(imgs_caption)
-        imgs_footnote_list.append(imgs_footnote)
-        titles_list.append(titles)
-        texts_list.append(texts)
-        interequations_list.append(interequations)
-        lists_list.append(lists)
-        indexs_list.append(indices)
+class _LazyPageImages:
+    """未传入 raw_images 时只按需光栅化页面上的指定区域，而不是一次渲染整本 PDF"""
+
+    def __init__(self, pdf_bytes, dpi=100):
+        self._pdf_doc = pdfium.PdfDocument(pdf_bytes)
+        self._dpi = dpi
+
+    def __len__(self):
+        return len(self._pdf_doc)
+
+    def render_region(self, index, bbox):
+        """
+        Rasterize only the area of a page covered by bbox.
+
+        Args:
+            index: Page index.
+            bbox: [x0, y0, x1, y1] in page display coordinates (origin at the top-left corner).
+
+        Returns:
+            The PIL image of the region, or None if bbox does not overlap the page.
+        """
+        page = self._pdf_doc[index]
+        try:
+            page_width, page_height = page.get_size()
+            x0, y0 = max(0, bbox[0]), max(0, bbox[1])
+            x1, y1 = min(page_width, bbox[2]), min(page_height, bbox[3])
+            if x0 >= x1 or y0 >= y1:
+                return None
+
+            # crop 为从页面四边裁掉的宽度 (left, bottom, right, top)
+            bitmap = page.render(scale=self._dpi / 72, crop=(x0, page_height - y1, page_width - x1, y0))
+            image = bitmap.to_pil()
+            bitmap.close()
+            return image
+        finally:
+            page.close()
+
+    def close(self):
+        self._pdf_doc.close()
+
+
+def _clean_page(page_image, bboxes, pdf_width, pdf_height):
+    """
+    Keep only the pixels inside the bboxes of one page and paint everything else white.
+
+    Args:
+        page_image: PIL image of the rendered page.
+        bboxes: List of [x0, y0, x1, y1] in PDF coordinates.
+        pdf_width: Width of the PDF page.
+        pdf_height: Height of the PDF page.
 
+    Returns:
+        The cleaned page as an RGB PIL image.
+    """
+    scale_w = page_image.width / pdf_width
+    scale_h = page_image.height / pdf_height
+
+    boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    scaled = boxes * np.array([scale_w * 0.9, scale_h * 0.9, scale_w, scale_h])
+    scaled[:, 0::2] = np.clip(scaled[:, 0::2], 0, page_image.width)
+    scaled[:, 1::2] = np.clip(scaled[:, 1::2], 0, page_image.height)
+    keep = (scaled[:, 0] < scaled[:, 2]) & (scaled[:, 1] < scaled[:, 3])
+
+    new_image = Image.new("RGB", page_image.size, "white")
+    for x0, y0, x1, y1 in scaled[keep].tolist():
+        # crop 由 PIL 对浮点坐标取整，粘贴位置截断取整
+        new_image.paste(page_image.crop((x0, y0, x1, y1)), (int(x0), int(y0)))
+    return new_image
+
+
+def _render_overlay(page_meta, page_groups, layout_bboxes):
+    """生成单页的叠加层 PDF 并返回其字节"""
+    packet = BytesIO()
+    c = canvas.Canvas(packet, pagesize=page_meta[:2])
+
+    # 空页面（没有任何 bbox）直接跳过绘制
+    if page_groups:
+        c = draw_bbox_groups_without_number(page_groups, page_meta, c)
+    if layout_bboxes:
+        c = draw_bbox_with_number(layout_bboxes, page_meta, c, COLORS['layout_index'], False, draw_bbox=False)
+
+    c.save()
+    return packet.getvalue()
+
+
+BLOCK_TYPE_TO_KEY = {
+    BlockType.TABLE: 'tables',
+    BlockType.IMAGE: 'imgs',
+    BlockType.TITLE: 'titles',
+    BlockType.TEXT: 'texts',
+    BlockType.INTERLINE_EQUATION: 'interequations',
+    BlockType.LIST: 'lists',
+    BlockType.INDEX: 'indexs',
+}
+
+NESTED_BLOCK_TYPE_TO_KEY = {
+    BlockType.TABLE: {
+        BlockType.TABLE_BODY: 'tables_body',
+        BlockType.TABLE_CAPTION: 'tables_caption',
+        BlockType.TABLE_FOOTNOTE: 'tables_footnote',
+    },
+    BlockType.IMAGE: {
+        BlockType.IMAGE_BODY: 'imgs_body',
+        BlockType.IMAGE_CAPTION: 'imgs_caption',
+        BlockType.IMAGE_FOOTNOTE: 'imgs_footnote',
+    },
+}
+
+CLEAN_PAGE_BBOX_KEYS = [
+    'tables_body', 'tables_caption', 'tables_footnote',
+    'imgs_body', 'imgs_caption', 'imgs_footnote',
+    'titles', 'texts', 'interequations', 'lists', 'indexs',
+]
+
+ALL_BBOX_KEYS = ['dropped', 'tables', 'imgs'] + CLEAN_PAGE_BBOX_KEYS
+
+# 填充图层的绘制顺序
+LAYOUT_FILL_KEYS = ['dropped'] + CLEAN_PAGE_BBOX_KEYS
+
+# 预先换算到 [0, 1] 的 RGB，避免每页每个图层重复做除法
+COLORS = {
+    'dropped': (158 / 255, 158 / 255, 158 / 255),
+    'tables_body': (204 / 255, 204 / 255, 0.0),
+    'tables_caption': (1.0, 1.0, 102 / 255),
+    'tables_footnote': (229 / 255, 1.0, 204 / 255),
+    'imgs_body': (153 / 255, 1.0, 51 / 255),
+    'imgs_caption': (102 / 255, 178 / 255, 1.0),
+    'imgs_footnote': (1.0, 178 / 255, 102 / 255),
+    'titles': (102 / 255, 102 / 255, 1.0),
+    'texts': (153 / 255, 0.0, 76 / 255),
+    'interequations': (0.0, 1.0, 0.0),
+    'lists': (40 / 255, 169 / 255, 92 / 255),
+    'indexs': (40 / 255, 169 / 255, 92 / 255),
+    'layout_index': (1.0, 0.0, 0.0),
+}
+
+
+def prepare_pdf(pdf_bytes):
+    """
+    Parse the PDF once so that draw_layout_bbox and draw_span_bbox can share the result.
+
+    Returns:
+        (pdf_reader, page_meta): the pypdf reader and the (width, height, rotation) of every page.
+    """
+    pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    return pdf_reader, _get_page_meta(pdf_reader)
+
+
+def _get_page_meta(pdf_reader):
+    return [_read_page_meta(page) for page in pdf_reader.pages]
+
+
+def draw_layout_bbox(
+        pdf_info, pdf_bytes, out_path, filename, raw_images=None, pdf_reader=None, page_meta=None
+):
+    if pdf_reader is None:
+        pdf_reader = PdfReader(BytesIO(pdf_bytes))
+    if page_meta is None:
+        page_meta = _get_page_meta(pdf_reader)
+
+    page_bboxes_list = []
     layout_bbox_list = []
 
     table_type_order = {"table_caption": 1, "table_body": 2, "table_footnote": 3}
     for page in pdf_info:
+        page_bboxes = defaultdict(list)
         page_block_list = []
+
+        page_bboxes['dropped'] = [dropped_bbox['bbox'] for dropped_bbox in page['discarded_blocks']]
         for block in page["para_blocks"]:
-            if block["type"] in [
-                BlockType.TEXT,
-                BlockType.TITLE,
-                BlockType.INTERLINE_EQUATION,
-                BlockType.LIST,
-                BlockType.INDEX,
-            ]:
-                bbox = block["bbox"]
-                page_block_list.append(bbox)
-            elif block["type"] in [BlockType.IMAGE]:
-                for sub_block in block["blocks"]:
-                    bbox = sub_block["bbox"]
-                    page_block_list.append(bbox)
-            elif block["type"] in [BlockType.TABLE]:
-                sorted_blocks = sorted(block["blocks"], key=lambda x: table_type_order[x["type"]])
-                for sub_block in sorted_blocks:
-                    bbox = sub_block["bbox"]
-                    page_block_list.append(bbox)
+            block_type = block["type"]
+            key = BLOCK_TYPE_TO_KEY.get(block_type)
+            if key is None:
+                continue
+            page_bboxes[key].append(block["bbox"])
+
+            nested_map = NESTED_BLOCK_TYPE_TO_KEY.get(block_type)
+            if nested_map is None:
+                page_block_list.append(block["bbox"])
+                continue
+
+            for nested_block in block["blocks"]:
+                nested_key = nested_map.get(nested_block["type"])
+                if nested_key is not None:
+                    page_bboxes[nested_key].append(nested_block["bbox"])
+
+            if block_type == BlockType.TABLE:
+                sub_blocks = sorted(block["blocks"], key=lambda x: table_type_order[x["type"]])
+            else:
+                sub_blocks = block["blocks"]
+            page_block_list.extend(sub_block["bbox"] for sub_block in sub_blocks)
 
+        page_bboxes_list.append(page_bboxes)
         layout_bbox_list.append(page_block_list)
 
+    # 按类型归并成逐页的并行列表，bbox_lists[key][i] 为第 i 页该类型的 bbox
+    bbox_lists = {
+        key: [page_bboxes[key] for page_bboxes in page_bboxes_list]
+        for key in ALL_BBOX_KEYS
+    }
+
     try:
         images = raw_images
-        assert images is not None
-        pdf_reader_for_size = PdfReader(BytesIO(pdf_bytes))
+        assert images is not None, "raw_images is None"
         cleaned_images = []
 
-        for i, page_info in enumerate(pdf_info):
+        for i in range(len(pdf_info)):
             if i >= len(images):
                 logger.warning(f"Page index {i} out of bounds for images list (length {len(images)}).")
                 continue
             
             page_image = images[i]
 
-            pdf_page = pdf_reader_for_size.pages[i]
-            pdf_width = float(pdf_page.cropbox[2])
-            pdf_height = float(pdf_page.cropbox[3])
+            pdf_width, pdf_height, _ = page_meta[i]
 
-            scale_w = page_image.width / pdf_width
-            scale_h = page_image.height / pdf_height
+            # 'dropped' 不参与 clean 页面
+            all_bboxes_for_page = [
+                bbox for key in CLEAN_PAGE_BBOX_KEYS for bbox in bbox_lists[key][i]
+            ]
 
-            new_image = Image.new("RGB", page_image.size, "white")
-            
-            #dropped_bbox_list[i] +
-            all_bboxes_for_page = (
-                tables_body_list[i] +
-                tables_caption_list[i] +
-                tables_footnote_list[i] +
-                imgs_body_list[i] +
-                imgs_caption_list[i] +
-                imgs_footnote_list[i] +
-                titles_list[i] +
-                texts_list[i] +
-                interequations_list[i] +
-                lists_list[i] +
-                indexs_list[i]
-            )
-            #all_bboxes_for_page = ([texts_list[i][-1]])
-
-            for bbox in all_bboxes_for_page:
-                pil_box = (
-                    bbox[0] * scale_w * 0.9,
-                    bbox[1] * scale_h * 0.9,
-                    bbox[2] * scale_w,
-                    bbox[3] * scale_h
-                )
-                
-                pil_box_safe = (
-                    max(0, pil_box[0]),
-                    max(0, pil_box[1]),
-                    min(page_image.width, pil_box[2]),
-                    min(page_image.height, pil_box[3])
-                )
-
-                if pil_box_safe[0] < pil_box_safe[2] and pil_box_safe[1] < pil_box_safe[3]:
-                    cropped_content = page_image.crop(pil_box_safe)
-                    paste_position = (int(pil_box_safe[0]), int(pil_box_safe[1]))
-                    new_image.paste(cropped_content, paste_position)
-            
-            cleaned_images.append(new_image)
+            cleaned_images.append(_clean_page(page_image, all_bboxes_for_page, pdf_width, pdf_height))
 
         if cleaned_images:
             base_name, _ = os.path.splitext(filename)
@@ -276,68 +379,40 @@ def draw_layout_bbox(pdf_info, pdf_bytes, out_path, filename, raw_images=None):
             clean_pdf_filename = f"{base_name}_clean.pdf"
             output_pdf_path = os.path.join(out_path, clean_pdf_filename)
 
+            # _clean_page 已保证输出为 RGB，这里无需逐张再 convert
             first_image = cleaned_images[0]
-            if first_image.mode != 'RGB':
-                first_image = first_image.convert('RGB')
-            
-            append_list = []
-            for img in cleaned_images[1:]:
-                if img.mode != 'RGB':
-                    append_list.append(img.convert('RGB'))
-                else:
-                    append_list.append(img)
-
             first_image.save(
-                output_pdf_path, "PDF", resolution=100.0, save_all=True, append_images=append_list
+                output_pdf_path, "PDF", resolution=100.0, save_all=True, append_images=cleaned_images[1:]
             )
 
     except Exception as e:
         logger.warning(f"Could not generate clean PDF: {e}")
 
-    pdf_bytes_io = BytesIO(pdf_bytes)
-    pdf_docs = PdfReader(pdf_bytes_io)
-    output_pdf = PdfWriter()
+    bbox_groups = [(bbox_lists[key], COLORS[key], True) for key in LAYOUT_FILL_KEYS]
 
-    for i, page in enumerate(pdf_docs.pages):
-        page_width, page_height = float(page.cropbox[2]), float(page.cropbox[3])
-        custom_page_size = (page_width, page_height)
-
-        packet = BytesIO()
-        c = canvas.Canvas(packet, pagesize=custom_page_size)
-
-        c = draw_bbox_without_number(i, dropped_bbox_list, page, c, [158, 158, 158], True)
-        c = draw_bbox_without_number(i, tables_body_list, page, c, [204, 204, 0], True)
-        c = draw_bbox_without_number(i, tables_caption_list, page, c, [255, 255, 102], True)
-        c = draw_bbox_without_number(i, tables_footnote_list, page, c, [229, 255, 204], True)
-        c = draw_bbox_without_number(i, imgs_body_list, page, c, [153, 255, 51], True)
-        c = draw_bbox_without_number(i, imgs_caption_list, page, c, [102, 178, 255], True)
-        c = draw_bbox_without_number(i, imgs_footnote_list, page, c, [255, 178, 102], True)
-        c = draw_bbox_without_number(i, titles_list, page, c, [102, 102, 255], True)
-        c = draw_bbox_without_number(i, texts_list, page, c, [153, 0, 76], True)
-        c = draw_bbox_without_number(i, interequations_list, page, c, [0, 255, 0], True)
-        c = draw_bbox_without_number(i, lists_list, page, c, [40, 169, 92], True)
-        c = draw_bbox_without_number(i, indexs_list, page, c, [40, 169, 92], True)
-        c = draw_bbox_with_number(i, layout_bbox_list, page, c, [255, 0, 0], False, draw_bbox=False)
-
-        c.save()
-        packet.seek(0)
-        overlay_pdf = PdfReader(packet)
+    output_pdf = PdfWriter()
 
+    overlay_bytes_list = []
+    for i in range(len(pdf_reader.pages)):
+        page_groups = [
+            (bbox_list[i], rgb, fill_config) for bbox_list, rgb, fill_config in bbox_groups if bbox_list[i]
+        ]
+        overlay_bytes_list.append(_render_overlay(page_meta[i], page_groups, layout_bbox_list[i]))
+
+    # 先一次性把原始页面全部加入 writer，再直接在 writer 的页面上合并叠加层，不再额外复制页面字典
+    output_pdf.append_pages_from_reader(pdf_reader)
+    for i, overlay_bytes in enumerate(overlay_bytes_list):
+        overlay_pdf = PdfReader(BytesIO(overlay_bytes))
         if len(overlay_pdf.pages) > 0:
-            new_page = PageObject(pdf=None)
-            new_page.update(page)
-            page = new_page
-            page.merge_page(overlay_pdf.pages[0])
-        else:
-            pass
-
-        output_pdf.add_page(page)
+            output_pdf.pages[i].merge_page(overlay_pdf.pages[0])
 
     with open(f"{out_path}/{filename}", "wb") as f:
         output_pdf.write(f)
 
 
-def draw_span_bbox(pdf_info, pdf_bytes, out_path, filename, raw_images=None):
+def draw_span_bbox(
+        pdf_info, pdf_bytes, out_path, filename, raw_images=None, pdf_reader=None, page_meta=None
+):
     last_span_bboxes = []
     next_page_text_spans_bboxes = []
 
@@ -374,55 +449,57 @@ def draw_span_bbox(pdf_info, pdf_bytes, out_path, filename, raw_images=None):
         else:
             last_span_bboxes.append(None)
 
+    images = None
     try:
-        images = raw_images
-
-        assert images is not None
-        pdf_reader_for_size = PdfReader(BytesIO(pdf_bytes))
+        if page_meta is None:
+            if pdf_reader is None:
+                pdf_reader = PdfReader(BytesIO(pdf_bytes))
+            page_meta = _get_page_meta(pdf_reader)
+        images = raw_images if raw_images is not None else _LazyPageImages(pdf_bytes)
 
         img_dir = os.path.join(out_path, "lastline")
         os.makedirs(img_dir, exist_ok=True)
 
+        page_indices = []
         for i in range(len(pdf_info)):
             if i >= len(images):
                 logger.warning(f"Page index {i} out of bounds for images list (length {len(images)}).")
                 continue
             
-            last_span_bbox = last_span_bboxes[i]
-            if not last_span_bbox:
+            if not last_span_bboxes[i]:
                 logger.warning(f"No text spans found for page {i}.")
                 continue
 
-            page_image = images[i]
-            pdf_page = pdf_reader_for_size.pages[i]
-            pdf_width = float(pdf_page.cropbox[2])
-            pdf_height = float(pdf_page.cropbox[3])
-            scale_w = page_image.width / pdf_width
-            scale_h = page_image.height / pdf_height
-
-            bbox = last_span_bbox
-            pil_box = (
-                bbox[0] * scale_w,
-                bbox[1] * scale_h,
-                bbox[2] * scale_w,
-                bbox[3] * scale_h
-            )
-            
-            pil_box_safe = (
-                max(0, pil_box[0]),
-                max(0, pil_box[1]),
-                min(page_image.width, pil_box[2]),
-                min(page_image.height, pil_box[3])
-            )
+            page_indices.append(i)
 
-
-            if pil_box_safe[0] < pil_box_safe[2] and pil_box_safe[1] < pil_box_safe[3]:
-                cropped_content = page_image.crop(pil_box_safe)
+        if isinstance(images, _LazyPageImages):
+            # 未传入 raw_images 时（如 demo/demo.py）同样输出 lastline 图片：
+            # 只光栅化最后一个 span 所在的区域，不渲染整页
+            cropped_list = [(i, images.render_region(i, last_span_bboxes[i])) for i in page_indices]
+        else:
+            cropped_list = []
+            if page_indices:
+                boxes = np.asarray([last_span_bboxes[i] for i in page_indices], dtype=np.float64)
+                image_sizes = np.asarray([images[i].size for i in page_indices], dtype=np.float64)
+                pdf_sizes = np.asarray([page_meta[i][:2] for i in page_indices], dtype=np.float64)
+                # 所有页的缩放和边界裁剪一次完成
+                scales = np.tile(image_sizes / pdf_sizes, 2)
+                pil_boxes = np.clip(boxes * scales, 0, np.tile(image_sizes, 2))
+
+                for i, pil_box_safe in zip(page_indices, pil_boxes.tolist()):
+                    if pil_box_safe[0] < pil_box_safe[2] and pil_box_safe[1] < pil_box_safe[3]:
+                        cropped_list.append((i, images[i].crop(tuple(pil_box_safe))))
+
+        for i, cropped_content in cropped_list:
+            if cropped_content is not None:
                 output_image_path = os.path.join(img_dir, f"page_{i:03d}_lastline.png")
                 cropped_content.save(output_image_path, "PNG")
 
     except Exception as e:
         logger.warning(f"Could not extract last line images: {e}")
+    finally:
+        if isinstance(images, _LazyPageImages):
+            images.close()
 
 
 if __name__ == "__main__":
@@ -440,8 +517,12 @@ if __name__ == "__main__":
 
     out_path = "/tmp/examples"
     print("checkout output in:", out_path)
+    # 只解析一次PDF，两个可视化函数共用
+    pdf_reader, page_meta = prepare_pdf(pdf_bytes)
     # 调用可视化函数,输出到examples目录
-    draw_layout_bbox(pdf_info, pdf_bytes, out_path, "output_with_layout.pdf")
+    draw_layout_bbox(pdf_info, pdf_bytes, out_path, "output_with_layout.pdf",
+                     pdf_reader=pdf_reader, page_meta=page_meta)
 
 
-    draw_span_bbox(pdf_info, pdf_bytes, out_path, "output_with_span_1.pdf")
+    draw_span_bbox(pdf_info, pdf_bytes, out_path, "output_with_span_1.pdf",
+                   pdf_reader=pdf_reader, page_meta=page_meta)
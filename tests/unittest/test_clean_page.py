@@ -0,0 +1,75 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from mineru.utils.draw_bbox import _clean_page
+
+
+def _reference_clean_page(page_image, bboxes, pdf_width, pdf_height):
+    # 逐个 bbox 裁剪粘贴的原始实现，作为 _clean_page 的对照
+    scale_w = page_image.width / pdf_width
+    scale_h = page_image.height / pdf_height
+    new_image = Image.new("RGB", page_image.size, "white")
+    for x0, y0, x1, y1 in bboxes:
+        pil_box_safe = (
+            max(0, x0 * scale_w * 0.9),
+            max(0, y0 * scale_h * 0.9),
+            min(page_image.width, x1 * scale_w),
+            min(page_image.height, y1 * scale_h),
+        )
+        if pil_box_safe[0] < pil_box_safe[2] and pil_box_safe[1] < pil_box_safe[3]:
+            new_image.paste(page_image.crop(pil_box_safe), (int(pil_box_safe[0]), int(pil_box_safe[1])))
+    return new_image
+
+
+def _random_page_image(rng, width, height, mode="RGB"):
+    channels = {"RGB": 3, "RGBA": 4}
+    shape = (height, width, channels[mode]) if mode in channels else (height, width)
+    return Image.fromarray(rng.integers(0, 256, size=shape, dtype=np.uint8), mode)
+
+
+def test_clean_page_keeps_only_bbox_content():
+    page_image = Image.new("RGB", (200, 100), (10, 20, 30))
+
+    cleaned = _clean_page(page_image, [[50, 20, 100, 60]], 200, 100)
+
+    assert cleaned.mode == "RGB"
+    assert cleaned.size == page_image.size
+    pixels = np.asarray(cleaned)
+    # x0 / y0 按 0.9 缩放：区域为 [45, 100) x [18, 60)
+    assert (pixels[18:60, 45:100] == (10, 20, 30)).all()
+    mask = np.ones(pixels.shape[:2], dtype=bool)
+    mask[18:60, 45:100] = False
+    assert (pixels[mask] == 255).all()
+
+
+def test_clean_page_without_bboxes_is_blank():
+    page_image = Image.new("RGB", (80, 60), (0, 0, 0))
+
+    cleaned = _clean_page(page_image, [], 80, 60)
+
+    assert cleaned.size == (80, 60)
+    assert (np.asarray(cleaned) == 255).all()
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA", "L"])
+def test_clean_page_matches_reference(mode):
+    rng = np.random.default_rng(0)
+    random.seed(0)
+    page_image = _random_page_image(rng, 850, 1100, mode)
+    pdf_width, pdf_height = 612.0, 792.0
+    bboxes = []
+    for _ in range(50):
+        x0, y0 = random.uniform(-20, pdf_width + 20), random.uniform(-20, pdf_height + 20)
+        # 包含退化、反向以及超出页面的 bbox
+        bboxes.append([x0, y0, x0 + random.uniform(-5, 200), y0 + random.uniform(-5, 40)])
+
+    cleaned = _clean_page(page_image, bboxes, pdf_width, pdf_height)
+
+    assert cleaned.mode == "RGB"
+    assert cleaned.size == page_image.size
+    expected = _reference_clean_page(page_image, bboxes, pdf_width, pdf_height)
+    assert np.array_equal(np.asarray(cleaned), np.asarray(expected))
@@ -0,0 +1,63 @@
+# Copyright (c) Opendatalab. All rights reserved.
+import random
+
+import numpy as np
+import pytest
+
+from mineru.utils.draw_bbox import cal_canvas_rect, cal_canvas_rect_batch
+
+
+def _reference_canvas_rect(page_width, page_height, rotation, bbox):
+    # 逐个 bbox 计算的原始实现，作为批量版本的对照
+    actual_width, actual_height = page_width, page_height
+    rotation = rotation % 360
+    if rotation in [90, 270]:
+        actual_width, actual_height = actual_height, actual_width
+
+    x0, y0, x1, y1 = bbox
+    rect_w = abs(x1 - x0)
+    rect_h = abs(y1 - y0)
+
+    if 270 == rotation:
+        rect_w, rect_h = rect_h, rect_w
+        x0 = actual_height - y1
+        y0 = actual_width - x1
+    elif 180 == rotation:
+        x0 = page_width - x1
+    elif 90 == rotation:
+        rect_w, rect_h = rect_h, rect_w
+        x0, y0 = y0, x0
+    else:
+        y0 = page_height - y1
+
+    return [x0, y0, rect_w, rect_h]
+
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270, -90, 45, 360, 450])
+def test_cal_canvas_rect_batch_matches_reference(rotation):
+    random.seed(rotation)
+    page_width, page_height = 612.0, 792.0
+    bboxes = []
+    for _ in range(200):
+        x0, y0 = random.uniform(-50, page_width), random.uniform(-50, page_height)
+        # 包含 x1 < x0 / y1 < y0 的反向 bbox
+        bboxes.append([x0, y0, x0 + random.uniform(-100, 300), y0 + random.uniform(-60, 120)])
+
+    rects = cal_canvas_rect_batch(page_width, page_height, rotation, bboxes)
+
+    assert rects.shape == (len(bboxes), 4)
+    expected = [_reference_canvas_rect(page_width, page_height, rotation, bbox) for bbox in bboxes]
+    np.testing.assert_allclose(rects, expected, rtol=0, atol=1e-9)
+
+
+def test_cal_canvas_rect_batch_empty():
+    assert cal_canvas_rect_batch(612.0, 792.0, 0, []).shape == (0, 4)
+
+
+@pytest.mark.parametrize("rotation", [0, 90, 180, 270])
+def test_cal_canvas_rect_matches_batch(rotation):
+    bbox = [10.5, 20.25, 110.0, 60.75]
+    rect = cal_canvas_rect(595.0, 842.0, rotation, bbox)
+
+    assert isinstance(rect, list)
+    assert rect == _reference_canvas_rect(595.0, 842.0, rotation, bbox)